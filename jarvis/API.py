@@ -3,17 +3,31 @@ Copyright (c) 2021 Philipp Scheer
 """
 
 
-import re
 import os
 import sys
 import time
+import atexit
 import inspect
 import traceback
+from threading import Lock
 from collections import OrderedDict
 from jarvis.Logger import Logger
 
 
 logger = Logger("API")
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(sys.argv[0]))
+
+
+class _TrieNode:
+    """A node in the route trie, one per topic segment  
+    `+` and `#` wildcards are stored in their own slots instead of `children`"""
+    __slots__ = ("children", "plus", "hash", "handler")
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.plus = None
+        self.hash = None
+        self.handler = None
 
 
 class API():
@@ -42,7 +56,7 @@ class API():
     ```"""
 
     AUTO_GENERATE_DOCUMENTATION = "APIDOC.py"
-    """Automatically generate a documentation when code snippets register API endpoints  
+    """Automatically generate a documentation of all registered API endpoints when the process exits  
     If you **do not** want to autogenerate a documentation, set to `False`  
     Otherwise, specify an absolute or relative path to the documentation file  
     The relative file will be placed in `/jarvis/server/<path>`  
@@ -52,44 +66,95 @@ class API():
     """A dictionary containing all the function documentations  
     Format: { `<endpoint>`: `<documentation>` }"""
 
+    _docs_dirty = False
+    """Set when `DOCUMENTATION` changed since the last time the documentation was sorted"""
+
+    _sorted_docs = []
+    """Cached list of `DOCUMENTATION` items, sorted by endpoint"""
+
     routes = {}
-    """A dictionary containing all registered routes"""
+    """A dictionary containing all registered routes  
+    Routes are dispatched through a trie, do not remove entries directly but use `API.unroute`"""
+
+    CACHE_SIZE = 4096
+    """Maximum number of resolved wildcard routes to keep in the lookup cache"""
+
+    _cache = OrderedDict()
+    """Least recently used cache of resolved routes, cleared whenever a route gets registered"""
+
+    _cache_lock = Lock()
+    """Guards `_cache`, routes are dispatched from several threads"""
+
+    _exact = {}
+    """Resolved routes without wildcards, looked up with a single dictionary access"""
+
+    _trie = _TrieNode()
+    """The root of the route trie, used to look up routes segment by segment"""
 
     @staticmethod
     def _get(route: str):
-        """Get routes from array, else return the default route"""
-        for subscription in API.routes:
-            reg = subscription.replace("+", "([^/]+)").replace("#", "([^ ]+)")
-            res = re.search(reg, route)
-            if re.match(reg, route):
-                # if subscription == route: # TODO: just a temporary solution, no regex in routing is allowed
-                # if MQTT.match(subscription, route):
-                if res:
-                    return { "fn": API.routes[subscription], 
-                             "args": list(res.groups())  }
-                else:
-                    return { "fn": API.routes[subscription], 
-                             "args": []  }
-        return { "fn": {
-                    "fn": API.default_route,
-                    "kwargs": {}}, 
-                 "args": []  }
+        """Get routes from the route trie, else return the default route"""
+        res = API._exact.get(route)
+        if res is not None:
+            return res
+        with API._cache_lock:
+            res = API._cache.get(route)
+            if res is not None:
+                API._cache.move_to_end(route)
+                return res
+        args = []
+        entry = API._match(API._trie, route.split("/"), 0, args)
+        if entry is None:
+            res = { "fn": {
+                        "fn": API.default_route,
+                        "kwargs": {}}, 
+                    "args": ()  }
+        else:
+            res = { "fn": entry, 
+                    "args": tuple(args)  }
+        with API._cache_lock:
+            API._cache[route] = res
+            if len(API._cache) > API.CACHE_SIZE:
+                API._cache.popitem(last=False)
+        return res
+
+    @staticmethod
+    def _match(node: _TrieNode, segments: list, i: int, args: list):
+        """Descend the route trie starting at `segments[i]`  
+        Literal segments are preferred over `+`, which is preferred over `#`  
+        Segments captured by wildcards are appended to `args`"""
+        if i == len(segments):
+            return node.handler
+        child = node.children.get(segments[i])
+        if child is not None:
+            entry = API._match(child, segments, i + 1, args)
+            if entry is not None:
+                return entry
+        if node.plus is not None:
+            args.append(segments[i])
+            entry = API._match(node.plus, segments, i + 1, args)
+            if entry is not None:
+                return entry
+            args.pop()
+        if node.hash is not None:
+            args.append("/".join(segments[i:]))
+            return node.hash
+        return None
 
     @staticmethod
     def execute(route: str, *args, **kwargs) -> set:
         """Execute a route with given arguments  
         Returns a tuple with `(True|False, object result)`"""
-        start = time.time()
+        start = time.perf_counter()
         try:
             endpoint = API._get(route)
-            res = endpoint["fn"]["fn"](endpoint["args"], *args, **kwargs)
-            # logger.d("Timing", f"Executing route '{route}' took {time.time()-start :.2f}s")
-            if isinstance(res, bool):
+            res = endpoint["fn"]["fn"](list(endpoint["args"]), *args, **kwargs)
+            if type(res) is bool:
                 return (res, None)
             return (True, res)
         except Exception as e:
             logger.e("Endpoint", f"Exception occured in endpoint {route}", traceback.format_exc())
-            logger.d("Timing",   f"Executing route '{route}' took {time.time()-start :.2f}s")
+            logger.d("Timing",   f"Executing route '{route}' took {time.perf_counter()-start :.2f}s")
             return (False, str(e))
 
     @staticmethod
@@ -100,40 +165,88 @@ class API():
     @staticmethod
     def route(path, **kwargs):
         """Decorator to register a route  
+        A route matches whole topics only, `+` matches one segment and `#` all remaining segments  
+        If several routes match a topic, literal segments win over `+`, which wins over `#`  
         [See usage](#API)"""
         def decor(func):
             API.DOCUMENTATION[path] = func.__doc__
-            API._save_docs()
-            def wrap(*args, **kwargs):
-                res = func(*args, **kwargs)
-                return res
-            API.routes[path] = {
-                "fn": wrap,
+            API._docs_dirty = True
+            entry = {
+                "fn": func,
                 "kwargs": kwargs
             }
-            return wrap
+            API.routes[path] = entry
+            with API._cache_lock:
+                API._cache.clear()
+            segments = path.split("/")
+            if "+" not in segments and "#" not in segments:
+                API._exact[path] = { "fn": entry, 
+                                     "args": ()  }
+            node = API._trie
+            for segment in segments:
+                if segment == "#":
+                    node.hash = entry
+                    break
+                if segment == "+":
+                    if node.plus is None:
+                        node.plus = _TrieNode()
+                    node = node.plus
+                else:
+                    node = node.children.setdefault(segment, _TrieNode())
+            else:
+                node.handler = entry
+            return func
         return decor
 
+    @staticmethod
+    def unroute(path: str) -> None:
+        """Unregister a route previously registered with `API.route`"""
+        if API.routes.pop(path, None) is None:
+            return
+        API.DOCUMENTATION.pop(path, None)
+        API._docs_dirty = True
+        API._exact.pop(path, None)
+        with API._cache_lock:
+            API._cache.clear()
+        node = API._trie
+        for segment in path.split("/"):
+            if segment == "#":
+                node.hash = None
+                return
+            node = node.plus if segment == "+" else node.children.get(segment)
+        node.handler = None
+
     @staticmethod
     def _save_docs() -> None:
+        """Write the documentation of all registered endpoints  
+        Runs once at exit instead of on every route registration"""
+        if not API.AUTO_GENERATE_DOCUMENTATION or not API.DOCUMENTATION:
+            return
+        if API._docs_dirty:
+            API._sorted_docs = sorted(API.DOCUMENTATION.items())
+            API._docs_dirty = False
         to_file = API.AUTO_GENERATE_DOCUMENTATION
         if not to_file.startswith("/"):
-            to_file = f"{os.path.dirname(os.path.abspath(sys.argv[0]))}/{API.AUTO_GENERATE_DOCUMENTATION}"
+            to_file = f"{_SCRIPT_DIR}/{API.AUTO_GENERATE_DOCUMENTATION}"
         try:
+            if API.AUTO_GENERATE_DOCUMENTATION.lower().endswith(".md"):
+                parts = ["# API Documentation\n\n"]
+                for e, d in API._sorted_docs:
+                    parts.append(f"## `{e}`  \n\n{d}\n\n")
+            elif API.AUTO_GENERATE_DOCUMENTATION.lower().endswith(".py"):
+                parts = ['"""\nCopyright (c) 2021 Philipp Scheer\n"""\n\nclass APIDOC:\n']
+                for e, d in API._sorted_docs:
+                    try:
+                        d = inspect.cleandoc(d)
+                    except Exception:
+                        d = "No documentation available!"
+                    parts.append(f'    def {e.replace("/", "_")}():\n        """\n`{e}`\n\n{d}"""\n\n')
+            else:
+                parts = []
             with open(to_file, "w") as f:
-                if API.AUTO_GENERATE_DOCUMENTATION.lower().endswith(".md"):
-                    f.write("# API Documentation\n\n")
-                    doc = OrderedDict(sorted(API.DOCUMENTATION.items()))
-                    for e, d in doc.items():
-                        f.write(f"## `{e}`  \n\n{d}\n\n")
-                elif API.AUTO_GENERATE_DOCUMENTATION.lower().endswith(".py"):
-                    f.write('"""\nCopyright (c) 2021 Philipp Scheer\n"""\n\nclass APIDOC:\n')
-                    doc = OrderedDict(sorted(API.DOCUMENTATION.items()))
-                    for e, d in doc.items():
-                        try:
-                            d = inspect.cleandoc(d)
-                        except Exception:
-                            d = "No documentation available!"
-                        f.write(f'    def {e.replace("/", "_")}():\n        """\n`{e}`\n\n{d}"""\n\n')
+                f.write("".join(parts))
         except Exception:
             print(traceback.format_exc())
+
+
+atexit.register(API._save_docs)
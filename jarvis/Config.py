@@ -3,47 +3,77 @@
 #
 
 
-from jarvis import Database, Logger
+from jarvis.Database import Database
+from jarvis.Logger import Logger
+import copy
+import time
 import traceback
 
 
 class Config:
     """A config class to store and load configuration information from the database"""
 
+    CACHE_TTL = 30
+    """Number of seconds a configuration value is served from the in-process cache  
+    Other processes might change the configuration, set to `0` to always ask the database"""
+
+    _cache = {}
+    """Cached configuration values, callers only ever get copies so they cannot change the cached values  
+    Format: { `<key>`: (`<value>`, `<time cached>`) }"""
+
     def __init__(self) -> None:
         """Create an instance of the Config class."""
-        self.db = Database.Database(exit_on_fail=False)
+        self.db = Database(exit_on_fail=False)
+
+    def _table(self):
+        """Get the config table, making sure lookups by `key` are indexed  
+        The index is stored as the design document `_design/idx_key`, which `Table.all` and `Table.count` skip"""
+        table = self.db.table("config")
+        table.ensure_index(["key"])
+        return table
 
     def set(self, key: str, value: object) -> bool:
         """Set a configuration key to a given value.  
         Sets `key` = `value`"""
         try:
-            res = self.db.table("config").find({ "key": { "$eq": key }})
+            table = self._table()
+            res = table.find({ "key": { "$eq": key }})
             if res.found:
-                res.update({
+                stored = res.update({
                     "value": value
                 })
             else:
-                self.db.table("config").insert({
+                stored = table.insert({
                     "key": key,
                     "value": value
                 })
+            if not stored:
+                Config._cache.pop(key, None)
+                return False
+            Config._cache[key] = (copy.deepcopy(value), time.monotonic())
             return True
-        except Database.Database.Exception:
+        except Database.Exception:
+            Config._cache.pop(key, None)
             Logger.e1("Config", "Set", f"Connection refused while setting key '{key}', database not running", traceback.format_exc())
         except Exception:
+            Config._cache.pop(key, None)
             Logger.e1("Config", "Set", f"Unknown error while setting key '{key}'", traceback.format_exc())
         return False
 
     def get(self, key: str, or_else: any = {}) -> object:
         """Get the value of a configuration key.  
         Returns `configuration`.`key` or if no entry found `or_else` which defaults to `{}`"""
+        cached = Config._cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < Config.CACHE_TTL:
+            return copy.deepcopy(cached[0])
         try:
-            res = self.db.table("config").find({"key": {"$eq": key}})
+            res = self._table().find({"key": {"$eq": key}})
             if res.found:
-                return res[0]["value"]
+                value = res[0]["value"]
+                Config._cache[key] = (copy.deepcopy(value), time.monotonic())
+                return value
             return or_else
-        except Database.Database.Exception:
+        except Database.Exception:
             Logger.e1("Config", "Get", f"Connection refused while getting key '{key}', database not running", traceback.format_exc())
         except Exception:
             Logger.e1("Config", "Get", f"Unknown error while getting key '{key}'", traceback.format_exc())
@@ -2,10 +2,15 @@
 # Copyright (c) 2020 by Philipp Scheer. All Rights Reserved.
 #
 
+import copy
+import time
 import types
 import couchdb2
 import requests
 import traceback
+from threading import Lock
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
 
 from jarvis_sdk import Storage
 
@@ -20,6 +25,13 @@ class Database:
     An exception or a list of exception which might occur while making operations with the Database
     """
 
+    POOL_SIZE = 32
+    """Maximum number of pooled HTTP connections kept open to a CouchDB server"""
+
+    _servers = {}
+    """CouchDB servers shared by all Database instances  
+    Format: { (`<hostname>`, `<port>`, `<username>`, `<password>`): `<couchdb2.Server>` }"""
+
     def __init__(self,  username: str = Storage.get("database::username", "admin"), 
                         password: str = Storage.get("database::password", "jarvis"), 
                         name: str = Storage.get("database::name", "jarvis"), 
@@ -35,21 +47,40 @@ class Database:
         * `hostname` specifies the hostname the database is running on
         * `port` specifies the port the database is running on
         * `exit_on_fail` if this switch is set, exit if the database is not running, default false
+
+        The connection is established on first use, not when the Database is created
         """
         self.host = hostname
         self.port = port
         self.user = username
         self.name = name
-        self.server = None
+        self._password = password
+        self._exit_on_fail = exit_on_fail
+        self._server = None
 
-        try:
-            self.server = couchdb2.Server(f"http://{self.host}:{self.port}/", username=self.user, password=password)
-        except Database.Exception as e:
-            if exit_on_fail:
-                from jarvis.Logger import Logger
-                Logger.e1("Database", "Exception", "Database is not reachable. Critical error, exiting", traceback.format_exc())
-                exit()
-            raise e
+    @property
+    def server(self) -> couchdb2.Server:
+        """The CouchDB server, connected on first access  
+        Connecting checks that the server is reachable and accepts the credentials, on failure `exit_on_fail` exits, otherwise the error is raised"""
+        if self._server is None:
+            key = (self.host, self.port, self.user, self._password)
+            server = Database._servers.get(key)
+            if server is None:
+                try:
+                    # basic auth on every request, a session cookie would expire while the cached server sits idle
+                    server = couchdb2.Server(f"http://{self.host}:{self.port}/", username=self.user, password=self._password, use_session=False)
+                    server._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=Database.POOL_SIZE))
+                    # creating the server sends no request, check once that it is reachable and accepts the credentials
+                    server.user_context
+                except Database.Exception as e:
+                    if self._exit_on_fail:
+                        from jarvis.Logger import Logger
+                        Logger.e1("Database", "Exception", "Database is not reachable. Critical error, exiting", traceback.format_exc())
+                        exit()
+                    raise e
+                Database._servers[key] = server
+            self._server = server
+        return self._server
 
     def table(self, table_name: str, pure: bool = False):
         """
@@ -58,13 +89,19 @@ class Database:
         The final table name therefore is `self.name`-`table_name`  
         If `pure` is True, the final table name is `table_name`
         """
-        return Table(self.server, table_name if pure else f"{self.name}-{table_name}")
+        name = table_name if pure else f"{self.name}-{table_name}"
+        table = Table._instances.get((id(self.server), name))
+        if table is None:
+            table = Table(self.server, name)
+            Table._instances[(id(self.server), name)] = table
+        return table
 
     def delete(self):
         """Delete the current Database """
         for db in self.server:
             if str(db).startswith(f"{self.name}-"):
                 db.destroy()
+                Table._forget(self.server, str(db))
 
     def drop(self):
         """Delete the current Database"""
@@ -100,6 +137,36 @@ class Database:
 class Table:
     """Represents a Table in a Database  
     This class should never be called by the user, only by the `Database` class"""
+
+    PAGE_SIZE = 1000
+    """Number of documents fetched per request when paging through query results"""
+
+    CACHE_SIZE = 1024
+    """Maximum number of documents kept in the `get` cache"""
+
+    CACHE_TTL = 30
+    """Number of seconds a document is served from the `get` cache  
+    Other processes might change documents, set to `0` to always ask the database"""
+
+    _documents = OrderedDict()
+    """Least recently used cache of documents fetched with `get`  
+    Format: { (`<id(server)>`, `<table name>`, `<id>`): (`<document>`, `<time cached>`) }"""
+
+    _generation = 0
+    """Incremented whenever cached documents get invalidated  
+    `get` does not cache a document if an invalidation happened while it was being fetched"""
+
+    _lock = Lock()
+    """Guards changes of `_documents` and `_generation`"""
+
+    _instances = {}
+    """Tables already opened by this process, so the existence check runs once per table  
+    Format: { (`<id(server)>`, `<table name>`): `<Table>` }"""
+
+    _indexed = set()
+    """Mango indexes created by this process  
+    Format: { (`<id(server)>`, `<table name>`, (`<field>`, ...)) }"""
+
     def __init__(self, server: couchdb2.Server, table_name: str) -> None:
         """
         Initialize the table  
@@ -108,21 +175,51 @@ class Table:
         """
         self.server = server
         self.name = table_name
-        if self.name in self.server:
+        self._server_id = id(server)
+        try:
             self.table = self.server.get(self.name)
-        else:
-            self.table = self.server.create(self.name)
+        except couchdb2.NotFoundError:
+            try:
+                self.table = self.server.create(self.name)
+            except couchdb2.CreationError:
+                # another process created the table in the meantime
+                self.table = self.server.get(self.name, check=False)
 
     def get(self, id: str) -> dict:
-        """Get a document from the current table by `id`"""
-        return self.table.get(id)
+        """Get a document from the current table by `id`  
+        Documents are cached for `CACHE_TTL` seconds, writes through this process invalidate the cache  
+        Every call returns its own copy of the document"""
+        key = (self._server_id, self.name, id)
+        cached = Table._documents.get(key)
+        if cached is not None and time.monotonic() - cached[1] < Table.CACHE_TTL:
+            try:
+                Table._documents.move_to_end(key)
+            except KeyError:
+                pass
+            return copy.deepcopy(cached[0])
+        generation = Table._generation
+        document = self.table.get(id)
+        if document is not None:
+            with Table._lock:
+                if generation == Table._generation:
+                    Table._documents[key] = (copy.deepcopy(document), time.monotonic())
+                    if len(Table._documents) > Table.CACHE_SIZE:
+                        Table._documents.popitem(last=False)
+        return document
+
+    def _invalidate(self, documents: list) -> None:
+        """Remove `documents` from the `get` cache"""
+        with Table._lock:
+            Table._generation += 1
+            for document in documents:
+                if isinstance(document, dict) and "_id" in document:
+                    Table._documents.pop((self._server_id, self.name, document["_id"]), None)
 
     def all(self) -> list:
-        """Return all documents from the current table"""
-        all_list = DocumentList(self)
-        for doc in self.table:
-            all_list.add(dict(doc))
-        return all_list
+        """Return all documents from the current table  
+        Documents are fetched from the database as the returned DocumentList gets accessed  
+        Design documents (`_design/...`, e.g. Mango indexes) are skipped"""
+        return DocumentList(self, (document for document in self.table if not document["_id"].startswith("_design/")))
 
     def insert(self, document: dict) -> any:
         """Insert a document in the current table"""
@@ -131,11 +228,25 @@ class Table:
             return True
         except Database.Exception:
             return False
+        finally:
+            self._invalidate([document])
+
+    def insert_many(self, documents: list) -> bool:
+        """Insert or update a list of documents in the current table using a single request  
+        Returns False if any document was rejected, e.g. because of a `_rev` conflict"""
+        try:
+            results = self.table.update(documents)
+            return all(result[0] for result in results)
+        except Database.Exception:
+            return False
+        finally:
+            self._invalidate(documents)
 
     def filter(self, filter: any = {}) -> list:
         """THE USE OF THIS FUNCTION IS DISCOURAGED! USE FIND INSTEAD!
         Filters a table  
         `filter` can be either a lamba or object  
+        An object gets translated into a Mango query, a document matches if all keys are equal  
         Returns a list of all documents that match"""
         doc_list = DocumentList(self)
         if (isinstance(filter, types.LambdaType)):
@@ -145,26 +256,67 @@ class Table:
         if (isinstance(filter, dict)):
             if len(filter) == 0:
                 return self.all()
-            for document in self.all():
-                for key in filter:
-                    if key in document and document[key] == filter[key]:
-                        doc_list.add(document)
+            selector = { key: { "$eq": value } for key, value in filter.items() }
+            bookmark = None
+            while True:
+                res = self.table.find(selector, limit=Table.PAGE_SIZE, bookmark=bookmark)
+                doc_list.document_list.extend(res["docs"])
+                if len(res["docs"]) < Table.PAGE_SIZE:
+                    break
+                bookmark = res["bookmark"]
         return doc_list
 
-    def find(self, filter: dict = {}) -> list:
-        """Find documents by a <a href="https://pouchdb.com/guides/mango-queries.html">Mango query</a>"""
+    def ensure_index(self, fields: list) -> None:
+        """Create a Mango index on `fields` unless this process already did  
+        Call this before running `find` queries on `fields`, so CouchDB does not need to scan the whole table  
+        The index is stored permanently as the design document `_design/idx_<fields>`, `all` and `count` skip design documents"""
+        key = (self._server_id, self.name, tuple(fields))
+        if key in Table._indexed:
+            return
+        name = "_".join(fields)
+        try:
+            self.table.put_index(list(fields), ddoc=f"idx_{name}", name=name)
+        except (couchdb2.CouchDB2Exception, requests.RequestException):
+            return
+        Table._indexed.add(key)
+
+    def find(self, filter: dict = {}, limit: int = None) -> list:
+        """Find documents by a <a href="https://pouchdb.com/guides/mango-queries.html">Mango query</a>  
+        Pass `limit` to stop after that many documents, e.g. `limit=1` for existence checks"""
         doc_list = DocumentList(self)
-        doc_list.document_list = self.table.find(filter)["docs"]
+        kwargs = {} if limit is None else {"limit": limit}
+        doc_list.document_list = self.table.find(filter, **kwargs)["docs"]
         return doc_list
 
     def delete(self, document):
         """Delete a document from the table"""
-        self.table.purge([document])
+        try:
+            self.table.purge([document])
+        finally:
+            self._invalidate([document])
+
+    def delete_many(self, documents: list):
+        """Delete a list of documents from the table using a single request"""
+        try:
+            self.table.purge(documents)
+        finally:
+            self._invalidate(documents)
 
     def drop(self):
         """Drop the current table"""
+        Table._forget(self.server, self.name)
         return self.table.destroy()
 
+    @staticmethod
+    def _forget(server: couchdb2.Server, table_name: str) -> None:
+        """Remove a dropped table and its indexes from the per-process caches"""
+        Table._instances.pop((id(server), table_name), None)
+        with Table._lock:
+            Table._generation += 1
+            for key in [key for key in list(Table._documents) if key[:2] == (id(server), table_name)]:
+                Table._documents.pop(key, None)
+        Table._indexed.difference_update([key for key in Table._indexed if key[:2] == (id(server), table_name)])
+
     @property
     def size(self):
         """Return the size of the current table in bytes"""
@@ -173,8 +325,9 @@ class Table:
     
     @property
     def count(self):
+        """Return the number of documents in the current table, without design documents"""
         info = dict(self.table.get_info())
-        return info["doc_count"]
+        return info["doc_count"] - len(self.table.get_designs()["rows"])
 
     def __str__(self) -> str:
         """Returns string representation of the current table"""
@@ -188,13 +341,45 @@ class DocumentList:
     A list of object with various additional features  
     This class should never be called by the user, only by the `Table` class
     """
-    def __init__(self, table: Table) -> None:
+    def __init__(self, table: Table, documents: any = None) -> None:
         """
         Initialize an empty DocumentList  
         * `table` is a `Table` object which got called by `Database`
+        * `documents` is an optional iterable of documents which gets consumed lazily
         """
         self.table = table
-        self.document_list = []
+        self._document_list = []
+        self._pending = None if documents is None else iter(documents)
+
+    @property
+    def document_list(self) -> list:
+        """
+        All documents of the DocumentList as a list, consumes all pending documents
+        """
+        self._fetch()
+        return self._document_list
+
+    @document_list.setter
+    def document_list(self, document_list: list) -> None:
+        self._document_list = document_list
+        self._pending = None
+
+    def _fetch(self, count: int = None) -> None:
+        """
+        Load pending documents until `count` documents are loaded, or all of them if `count` is None
+        """
+        if self._pending is None:
+            return
+        if count is None:
+            self._document_list.extend(self._pending)
+            self._pending = None
+            return
+        while len(self._document_list) < count:
+            try:
+                self._document_list.append(next(self._pending))
+            except StopIteration:
+                self._pending = None
+                return
 
     def add(self, item: dict) -> None:
         """
@@ -206,36 +391,35 @@ class DocumentList:
         """
         Update a document, the document needs to contain an _id and _rev (CouchDB internals)
         """
-        for document in self.document_list:
-            if "_id" not in new_document:
-                new_document["_id"] = document["_id"]
-                new_document["_rev"] = document["_rev"]
-            self.table.insert(new_document)
+        if len(self.document_list) == 0:
+            return
+        if "_id" not in new_document:
+            new_document["_id"] = self.document_list[0]["_id"]
+            new_document["_rev"] = self.document_list[0]["_rev"]
+        self.table.insert(new_document)
 
     def update(self, modify_function_or_new_object: any) -> None:
         """
         Update all documents using a function or a dictionary with updated keys  
         The if a function is passed, the object the function returns is used,  
-        else the merged dictionaries
+        else the merged dictionaries  
+        All documents are written using a single request  
+        Returns False if any document could not be written
         """
         if isinstance(modify_function_or_new_object, dict):
-            for document in self.document_list:
-                def merge_dicts(x, y):
-                    z = x.copy()
-                    z.update(y)
-                    return z
-                self.table.insert(merge_dicts(document, modify_function_or_new_object))
+            batch = [{**document, **modify_function_or_new_object} for document in self.document_list]
         else:
-            for old_document in self.document_list:
-                new_document = modify_function_or_new_object(dict(old_document))
-                self.table.insert(new_document)
+            batch = [modify_function_or_new_object(dict(old_document)) for old_document in self.document_list]
+        if not batch:
+            return True
+        return self.table.insert_many(batch)
 
     def delete(self) -> None:
         """
-        Delete all documents in the current DocumentList
+        Delete all documents in the current DocumentList using a single request
         """
-        for document in self.document_list:
-            self.table.delete(document)
+        if self.document_list:
+            self.table.delete_many(self.document_list)
 
     def sort(self, keyname: str) -> None:
         """
@@ -255,16 +439,39 @@ class DocumentList:
     @property
     def found(self):
         """
-        Check if the Table query returned any results (length of the current DocumentList is not 0)
+        Check if the Table query returned any results (length of the current DocumentList is not 0)  
+        Loads at most one pending document
         """
-        return len(self.document_list) != 0
+        self._fetch(1)
+        return len(self._document_list) != 0
 
     def __getitem__(self, key: int):
         """
         Get element from DocumentList
         """
+        if isinstance(key, int) and key >= 0:
+            self._fetch(key + 1)
+            return self._document_list[key]
         return self.document_list[key]
 
+    def __iter__(self):
+        """
+        Iterate over the DocumentList, loading pending documents one by one
+        """
+        i = 0
+        while True:
+            self._fetch(i + 1)
+            if i >= len(self._document_list):
+                return
+            yield self._document_list[i]
+            i += 1
+
+    def __len__(self) -> int:
+        """
+        Number of documents in the DocumentList, consumes all pending documents
+        """
+        return len(self.document_list)
+
     def __setitem__(self, key: int, val):
         """Set element in DocumentList"""
         self.document_list[key] = val
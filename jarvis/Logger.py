@@ -5,7 +5,6 @@
 import time
 import traceback
 from datetime import datetime
-from jarvis import Database
 
 
 class Logger:
@@ -96,9 +95,11 @@ class Logger:
             if exception_str is not None:
                 obj["exception"] = exception_str
 
+            # imported here so loading the Logger (and the API) does not load the database driver
+            from jarvis.Database import Database
             try:
-                Database.Database(exit_on_fail=False).table("logs").insert(obj)
-            except Database.Database.Exception:
+                Database(exit_on_fail=False).table("logs").insert(obj)
+            except Database.Exception:
                 Logger.e1("Logger", "DB", "Failed to insert log data, database not running", traceback.format_exc(), database_entry=False)
 
     @staticmethod
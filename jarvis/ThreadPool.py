@@ -11,6 +11,12 @@ class ThreadPool:
     """ThreadPool stores a list of background threads and provides several features to control these threads"""
 
     _all_threads = []
+    _threads_by_name = {}
+    """Index of `_all_threads` by thread name, the first registered thread wins"""
+    _threads_by_function = {}
+    """Index of `_all_threads` by target function, the first registered thread wins"""
+    _unhashable_threads = []
+    """Threads whose target function cannot be used as a dictionary key, `status` scans these"""
 
     def __init__(self, logging_instance: any = None) -> None:
         """Initialize an empty ThreadPool with a given `logging_instance`  
@@ -24,14 +30,19 @@ class ThreadPool:
         * `thread_name` specifies a short and descriptive name what this function is doing
         * `args` specifies a list of arguments which should be passed to the function"""
         t = Thread(target=target_function, name=thread_name, args=args)
-        t.start()
         t_object = {
             "name": thread_name,
             "function": target_function,
             "thread": t
         }
+        try:
+            ThreadPool._threads_by_function.setdefault(target_function, t_object)
+        except TypeError:
+            ThreadPool._unhashable_threads.append(t_object)
+        ThreadPool._threads_by_name.setdefault(thread_name, t_object)
         self._threads.append(t_object)
         ThreadPool._all_threads.append(t_object)
+        t.start()
     
     def status(self, internal_thread_object: dict = None, thread: Thread = None, thread_name: str = None, target_function: any = None) -> bool:
         """Get the status of a background thread given a Thread object, thread name or target function.  
@@ -39,17 +50,20 @@ class ThreadPool:
         if thread is not None:
             return thread.is_alive()
         elif internal_thread_object is not None:
-            for t in ThreadPool._all_threads:
-                if t["name"] == internal_thread_object.get("name", ""):
-                    return t["thread"].is_alive()
+            t = ThreadPool._threads_by_name.get(internal_thread_object.get("name", ""))
         elif thread_name is not None:
-            for t in ThreadPool._all_threads:
-                if t["name"] == thread_name:
-                    return t["thread"].is_alive()
+            t = ThreadPool._threads_by_name.get(thread_name)
         elif target_function is not None:
-            for t in ThreadPool._all_threads:
-                if t["function"] == target_function:
-                    return t["thread"].is_alive()
+            try:
+                t = ThreadPool._threads_by_function.get(target_function)
+            except TypeError:
+                t = None
+            if t is None:
+                t = next((t for t in ThreadPool._unhashable_threads if t["function"] == target_function), None)
+        else:
+            t = None
+        if t is not None:
+            return t["thread"].is_alive()
         return None
     
     def all(self, include_children: bool = False):
@@ -59,8 +73,7 @@ class ThreadPool:
 
     @staticmethod
     def background(coroutine, *args):
-        def _handle(loop, *args):
+        def _handle(*args):
             asyncio.run(coroutine(*args))
-        loop = asyncio.new_event_loop()
-        t = Thread(target=_handle, args=[loop] + list(args))
+        t = Thread(target=_handle, args=args)
         t.start()
@@ -3,15 +3,22 @@ Copyright (c) 2021 Philipp Scheer
 """
 
 
-import time
 import json
-import random
-import traceback
-import jinja2
-from jarvis import Database, Security, Config
+from jarvis.Database import Database
+from jarvis.Security import Security
+from jarvis.Config import Config
+
+
+def _users():
+    """Get the users table  
+    Opened tables are reused by `Database.table`, so this does not hit the database after the first call"""
+    return Database().table("users")
 
 
 class User:
+    FIELDS = ("id", "username", "password")
+    """Keys stored as attributes of the User, everything else lives in `User.data`"""
+
     def __init__(self, id=None, username=None, password=None, _id=None, **data) -> None:
         self.id = id or _id
         self.username = username
@@ -20,7 +27,7 @@ class User:
 
     def save(self):
         try:
-            old_user = User.from_id(self.id)
+            old_user = User.from_id(self.id) if self.id is not None else None
             ud = { **self.data,
                 "username": self.username,
                 "password": self.password,
@@ -30,7 +37,7 @@ class User:
                     "_rev": old_user._rev,
                     "_id": old_user.id
                 }
-            Database().table("users").insert(ud)
+            _users().insert(ud)
             self.id = ud["_id"]
             return ud["_id"]
         except Exception:
@@ -40,7 +47,9 @@ class User:
         return self.__dict__()
 
     def get(self, key, or_else):
-        return self.__dict__().get(key, or_else)
+        if key in User.FIELDS:
+            return getattr(self, key)
+        return self.data.get(key, or_else)
 
     @classmethod
     def new(cls, username, password, **additional_data):
@@ -57,7 +66,7 @@ class User:
 
     @classmethod
     def from_id(cls, id):
-        res = Database().table("users").find({ "_id": { "$eq": id } })
+        res = _users().find({ "_id": { "$eq": id } })
         if res.found:
             res = res[0]
             return cls(**res)
@@ -65,7 +74,7 @@ class User:
     
     @classmethod
     def from_email(cls, email):
-        res = Database().table("users").find({ "email": { "$eq": email }})
+        res = _users().find({ "email": { "$eq": email }})
         if res.found:
             res = res[0]
             return cls(**res)
@@ -86,14 +95,15 @@ class User:
         }
 
     def __getitem__(self, key):
-        return self.__dict__().get(key, None)
+        return self.get(key, None)
 
     def __getattr__(self, key):
-        return self.__dict__().get(key, None)
+        # only called for keys that are not real attributes, so `User.FIELDS` never end up here
+        return self.data.get(key, None)
 
     @staticmethod
     def validate(username, password):
-        result = Database().table("users").find({
+        result = _users().find({
             "username": { "$eq": username },
             "password": { "$eq": User.hash(password) }
         })
@@ -107,9 +117,9 @@ class User:
 
     @staticmethod
     def exists(username):
-        return len(list(Database().table("users").find({ "username": { "$eq": username }}))) > 0
+        return _users().find({ "username": { "$eq": username }}, limit=1).found
         
     @staticmethod
     def count():
-        return len(list(Database().table("users").all()))
+        return _users().count
 
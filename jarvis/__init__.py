@@ -1,35 +1,59 @@
-"""
-## Helper Module
-
-### List of classes:
-* [API](jarvis/API.html)
-* [NLU](jarvis/NLU.html)
-* [MQTT](jarvis/MQTT.html)
-* [Connection](jarvis/Connection.html)
-* [Colors](jarvis/Colors.html)
-* [Config](jarvis/Config.html)
-* [SetupTools](jarvis/SetupTools.html)
-* [Exiter](jarvis/Exiter.html)
-* [Mime](jarvis/Mime.html)
-* [Security](jarvis/Security.html)
-* [ThreadPool](jarvis/ThreadPool.html)
-* [Logger](jarvis/Logger.html)
-* [Database](jarvis/Database.html)
-* [User](jarvis/User.html)
-"""
-
-from .API import *
-from .Config import *
-from .Exiter import *
-from .Security import *
-from .ThreadPool import *
-from .Logger import *
-from .Database import *
-from .User import *
-
-def update():
-    try:
-        from pip._internal import main as pipmain
-        pipmain(["install", "--upgrade", "--no-deps", "open-jarvis"])
-    except Exception:
-        print("WARNING: pip could not update, not critical")
+import os
+import sys
+import types
+import importlib
+
+
+_SUBMODULES = ("API", "Config", "Exiter", "Security", "ThreadPool", "Logger", "Database", "User")
+"""Submodules of jarvis, each one defines a class with the same name"""
+
+_LAZY = {
+    **{name: f"jarvis.{name}" for name in _SUBMODULES},
+    "Table": "jarvis.Database",
+    "DocumentList": "jarvis.Database",
+    "update": "jarvis._update:update",
+    "update_many": "jarvis._update:update_many"
+}
+"""Exported names and the submodule defining them (`module:attribute` if the names differ), submodules are only imported on first access"""
+
+__all__ = list(_LAZY)
+
+__doc__ = "## Helper Module\n\n### List of classes:\n" + "".join(f"* [{name}](jarvis/{name}.html)\n" for name in _SUBMODULES) \
+    + "\nOn Python 3.7 and newer, submodules are imported on first use, set the environment variable `JARVIS_EAGER_IMPORT=1` to import all of them on `import jarvis`\n"
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # after importing a submodule, Python binds it to the package (`jarvis.Database = <module>`)
+        # every submodule is named after its class, so keep exporting the class instead
+        if isinstance(value, types.ModuleType) and value.__name__ == f"{self.__name__}.{name}" and hasattr(value, name):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+def __getattr__(name):
+    target = _LAZY.get(name)
+    if target is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    target, _, attribute = target.partition(":")
+    module = sys.modules.get(target) or importlib.import_module(target)
+    value = getattr(module, attribute or name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+sys.modules[__name__].__class__ = _Package
+
+# Exiter installs its SIGINT and SIGTERM handlers on import, applications rely on that happening on `import jarvis`
+from jarvis.Exiter import Exiter  # noqa: F401
+
+
+if sys.version_info < (3, 7) or os.environ.get("JARVIS_EAGER_IMPORT") == "1":
+    # module level __getattr__ needs Python 3.7 (PEP 562), older versions import everything right away
+    # JARVIS_EAGER_IMPORT does the same, so broken submodules fail on `import jarvis` instead of on first use
+    for _name in __all__:
+        __getattr__(_name)
@@ -0,0 +1,35 @@
+"""
+Copyright (c) 2021 Philipp Scheer
+"""
+
+
+import sys
+import warnings
+import subprocess
+
+
+_update_failed = None
+"""Set to the error if pip could not be started, later updates in the same process are skipped  
+Failed pip runs (e.g. an unknown package) are not remembered, they only affect the packages asked for"""
+
+
+def update():
+    """Upgrade open-jarvis to the latest release"""
+    update_many(["open-jarvis"])
+
+
+def update_many(packages: list):
+    """Upgrade the given packages (without their dependencies) in a single pip run"""
+    global _update_failed
+    if _update_failed is not None:
+        warnings.warn(f"pip could not update, not critical: pip failed to start earlier ({_update_failed}), skipping", RuntimeWarning)
+        return
+    try:
+        subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "--no-deps", *packages],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        _update_failed = e
+        warnings.warn(f"pip could not update, not critical: {e}", RuntimeWarning)
+    except subprocess.SubprocessError as e:
+        details = (getattr(e, "stderr", None) or b"").decode("utf-8", "replace").strip()
+        warnings.warn(f"pip could not update, not critical: {details or e}", RuntimeWarning)
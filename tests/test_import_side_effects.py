@@ -0,0 +1,53 @@
+"""
+Copyright (c) 2021 Philipp Scheer
+"""
+
+
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNAPSHOT = """
+import sys, json, signal
+import jarvis
+print(json.dumps({
+    "modules": sorted(name for name in sys.modules if name == "jarvis" or name.startswith("jarvis.")),
+    "drivers": sorted(name for name in ("couchdb2", "requests") if name in sys.modules),
+    "sigint": getattr(signal.getsignal(signal.SIGINT), "__qualname__", None),
+    "sigterm": getattr(signal.getsignal(signal.SIGTERM), "__qualname__", None)
+}))
+"""
+
+
+def import_jarvis() -> dict:
+    """Run `import jarvis` in a fresh interpreter and return what it left behind"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("JARVIS_EAGER_IMPORT", None)
+    output = subprocess.run([sys.executable, "-c", SNAPSHOT], env=env, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+class TestImportSideEffects(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = import_jarvis()
+
+    def test_exiter_installs_signal_handlers(self):
+        self.assertEqual(self.snapshot["sigint"], "Exiter.exit_fn")
+        self.assertEqual(self.snapshot["sigterm"], "Exiter.exit_fn")
+
+    @unittest.skipIf(sys.version_info < (3, 7), "Python 3.6 imports all submodules eagerly")
+    def test_other_submodules_stay_unloaded(self):
+        self.assertEqual(self.snapshot["modules"], ["jarvis", "jarvis.Exiter"])
+        self.assertNotIn("jarvis.Database", self.snapshot["modules"])
+        self.assertNotIn("jarvis.API", self.snapshot["modules"])
+        self.assertEqual(self.snapshot["drivers"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()